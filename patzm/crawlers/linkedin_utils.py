@@ -1,20 +1,50 @@
 import configparser
 import getpass
+import hashlib
+import json
 import os
 import pickle
 import re
-from typing import List, Optional, Tuple
-
-import Levenshtein
+import signal
+import sqlite3
+import tempfile
+import time
+from typing import List, NamedTuple, Optional, Tuple
+from urllib import parse
+
+import requests
 from pydantic import BaseModel, Field
+from rapidfuzz import fuzz
 from selenium import webdriver
 from selenium.common import exceptions
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions, wait
 
+#: How long cached company search results stay valid.
+COMPANY_CACHE_TTL = 7 * 24 * 3600
+
+#: The fixed marionette port used when sessions are reused across invocations.
+MARIONETTE_PORT = 2828
+
+_COMPANY_ID_PATTERN = re.compile(r"%22(\d+)%22")
+_USERNAME_PATTERN = re.compile(r"https://www\.linkedin\.com/in/([^/]+)/?")
+
+
+class Credentials(NamedTuple):
+    username: str
+    password: str
+
 
 class LinkedInProvider:
-    def __init__(self, config_dir: str, cache_dir: str, login: Optional[str] = None, headless: bool = True, open_session: bool = True):
+    def __init__(
+        self,
+        config_dir: str,
+        cache_dir: str,
+        login: Optional[str] = None,
+        headless: bool = True,
+        open_session: bool = True,
+        reuse_session: bool = False,
+    ):
         """A selenium-based interface to browse LinkedIn.
 
         Parameters
@@ -35,17 +65,39 @@ class LinkedInProvider:
             Whether the web browser window (Firefox) is headless (no GUI).
         open_session
             Whether to directly open a session or not.
+        reuse_session
+            Whether to keep the browser running on shutdown and reattach to it on the next invocation,
+            skipping the browser cold start.
         """
         self.driver = None
-        
+        self._waiters = {}
+
         self._login = login
+        self._reuse_session = reuse_session
+        self._attached = False
         self._firefox_options = webdriver.FirefoxOptions()
         if headless:
             self._firefox_options.add_argument("-headless")
+        if reuse_session:
+            # Pin the marionette port so a later invocation knows where to reconnect.
+            self._firefox_options.set_preference("marionette.port", MARIONETTE_PORT)
+        # Return from `driver.get` as soon as the DOM is parsed instead of waiting for every tracker and ad to
+        # finish loading; all call sites gate on `wait_for` with the selector they actually need.
+        self._firefox_options.set_capability("pageLoadStrategy", "eager")
+        # Only DOM text and attributes are ever read, so skip images, media, and notification machinery.
+        self._firefox_options.set_preference("permissions.default.image", 2)
+        self._firefox_options.set_preference("dom.webnotifications.enabled", False)
+        self._firefox_options.set_preference("dom.push.enabled", False)
+        self._firefox_options.set_preference("media.autoplay.default", 5)
 
         self._config_dir = config_dir
         self._cache_dir = cache_dir
-        self._username_pattern = re.compile(r"https://www\.linkedin\.com/in/([^/]+)/?")
+
+        self._company_cache = sqlite3.connect(os.path.join(cache_dir, "company_cache.sqlite"))
+        self._company_cache.execute(
+            "CREATE TABLE IF NOT EXISTS company_cache (name TEXT PRIMARY KEY, payload BLOB, ts REAL)"
+        )
+
         if open_session:
             self.open_session()
 
@@ -53,7 +105,22 @@ class LinkedInProvider:
         self.close_session()
     
     def open_session(self):
-        self.driver = webdriver.Firefox(options=self._firefox_options)
+        session_file = os.path.join(self._cache_dir, "driver_session.json")
+        if self._reuse_session:
+            self.driver = self._attach_driver(session_file)
+            self._attached = self.driver is not None
+
+        if self.driver is None:
+            self.driver = webdriver.Firefox(options=self._firefox_options)
+            if self._reuse_session:
+                session = {
+                    "firefox_pid": self.driver.capabilities["moz:processID"],
+                    "marionette_port": MARIONETTE_PORT,
+                }
+                with open(session_file, "w") as file:
+                    json.dump(session, file)
+
+        self._waiters = {}
 
         if self.activate_session(self._login):
             print("Login / session activation successful 🎉")
@@ -64,8 +131,8 @@ class LinkedInProvider:
         cookies_file = os.path.join(self._cache_dir, "linkedin_cookies.pkl")
         use_cookies = login is None and os.path.exists(cookies_file)
         if use_cookies:
-            self._load_cookies(cookies_file)
-            if self.validate_login():
+            cookies = self._load_cookies(cookies_file)
+            if self._cookies_are_fresh(cookies, cookies_file) or self.validate_login():
                 return True
 
         credentials = self._get_login_credentials(login)
@@ -77,25 +144,77 @@ class LinkedInProvider:
             return False
 
     def close_session(self):
-        if self.driver is not None:
-            self.driver.close()
-            self.driver.quit()
+        if self.driver is None:
+            return
+
+        if self._reuse_session:
+            if self._attached:
+                # This geckodriver was started with --connect-existing, so quitting it only ends the
+                # driver process and leaves the browser running.
+                self.driver.quit()
+            # Otherwise leave the browser and its geckodriver running for the next invocation.
             self.driver = None
-        
-    def login(self, credentials: configparser.ConfigParser):
+            return
+
+        self.driver.close()
+        self.driver.quit()
+        self.driver = None
+
+    def _attach_driver(self, session_file: str) -> Optional[webdriver.Firefox]:
+        """Attach a fresh geckodriver to a browser left running by a previous invocation, if possible."""
+        if not os.path.exists(session_file):
+            return None
+
+        with open(session_file) as file:
+            session = json.load(file)
+
+        # geckodriver serves exactly one session, so the driver from the previous invocation cannot
+        # accept a new one; a new geckodriver connects to the browser's pinned marionette port instead.
+        service = webdriver.FirefoxService(
+            service_args=["--connect-existing", "--marionette-port", str(session["marionette_port"])]
+        )
+        try:
+            return webdriver.Firefox(service=service, options=self._firefox_options)
+        except Exception:
+            # The recorded browser is unusable (e.g. gone after a reboot); kill any remnant of it so
+            # orphaned processes don't pile up, then fall back to a fresh start.
+            try:
+                os.kill(session["firefox_pid"], signal.SIGTERM)
+            except OSError:
+                pass
+            os.remove(session_file)
+            return None
+
+    def http_session(self) -> requests.Session:
+        """Build a :class:`requests.Session` from the driver's cookies 🍪 for browser-less requests."""
+        session = requests.Session()
+        for cookie in self.driver.get_cookies():
+            session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"))
+            if cookie["name"] == "JSESSIONID":
+                # LinkedIn expects the JSESSIONID value mirrored in the csrf-token header.
+                session.headers["csrf-token"] = cookie["value"].strip('"')
+        session.headers["user-agent"] = self.driver.execute_script("return navigator.userAgent;")
+        return session
+
+    def login(self, credentials: Credentials):
         login_url = "https://www.linkedin.com/login"
         self.driver.get(login_url)
         if self.driver.current_url != login_url and self.validate_login():
             print("Already logged in 🙄")
             return
 
+        # send_keys dispatches one driver round-trip per character; set the value directly and fire a
+        # single input event so the login form still notices the change.
+        fill_script = (
+            "arguments[0].value = arguments[1]; "
+            "arguments[0].dispatchEvent(new Event('input', {bubbles: true}));"
+        )
+
         username_field = self.driver.find_element(by=By.ID, value="username")
-        username_field.clear()
-        username_field.send_keys(credentials["linkedin"]["username"])
+        self.driver.execute_script(fill_script, username_field, credentials.username)
 
         password_field = self.driver.find_element(by=By.ID, value="password")
-        password_field.clear()
-        password_field.send_keys(credentials["linkedin"]["password"])
+        self.driver.execute_script(fill_script, password_field, credentials.password)
 
         login_button = self.driver.find_element(by=By.CSS_SELECTOR, value="[type='submit']")
         login_button.click()
@@ -112,57 +231,107 @@ class LinkedInProvider:
         success = self.driver.current_url == "https://www.linkedin.com/mynetwork/"
         return success
 
-    def _get_login_credentials(self, login: Optional[str] = None) -> configparser.ConfigParser:
-        def _get_config_parser(username: str, password: str) -> configparser.ConfigParser:
-            credentials = configparser.ConfigParser()
-            credentials["linkedin"] = {}
-            credentials["linkedin"]["username"] = username
-            credentials["linkedin"]["password"] = password
-            return credentials
-
+    def _get_login_credentials(self, login: Optional[str] = None) -> Credentials:
         if login == "":
             username = input("Provide your LinkedIn username:")
             password = getpass.getpass("Provide your LinkedIn password:")
-            return _get_config_parser(username, password)
+            return Credentials(username, password)
         else:
             if login is None:
                 login = os.path.join(self._config_dir, "credentials.ini")
 
+            # RawConfigParser keeps %-signs in passwords intact; only the file on disk stays in the
+            # ini format.
             if not os.path.exists(login):
-                credentials = _get_config_parser("your@email.com", "your-password")
+                template = configparser.RawConfigParser()
+                template["linkedin"] = {"username": "your@email.com", "password": "your-password"}
                 with open(login, "w") as credentials_file:
-                    credentials.write(credentials_file)
+                    template.write(credentials_file)
 
                 print(f"The template credentials file has been written to {login}. Fill it.")
                 exit(0)
             else:
-                credentials = configparser.ConfigParser()
-                credentials.read(login)
-                return credentials
+                parser = configparser.RawConfigParser()
+                parser.read(login)
+                return Credentials(parser["linkedin"]["username"], parser["linkedin"]["password"])
 
-    def _load_cookies(self, cookies_file: str):
+    def _load_cookies(self, cookies_file: str) -> List[dict]:
         self.driver.get("https://www.linkedin.com/")
 
         with open(cookies_file, "rb") as file:
-            cookies = pickle.load(file)
-            for cookie in cookies:
-                self.driver.add_cookie(cookie)
+            data = file.read()
+
+        try:
+            cookies = json.loads(data)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            # Cookie files written before the switch to JSON.
+            cookies = pickle.loads(data)
+
+        for cookie in cookies:
+            self.driver.add_cookie(cookie)
+        return cookies
+
+    @staticmethod
+    def _cookies_are_fresh(cookies: List[dict], cookies_file: str) -> bool:
+        """Whether the session cookie is valid long enough to skip the validation page load."""
+        if time.time() - os.path.getmtime(cookies_file) > 3600:
+            return False
+
+        for cookie in cookies:
+            if cookie.get("name") == "li_at":
+                return cookie.get("expiry", 0) > time.time() + 3600
+        return False
 
     def _save_cookies(self, cookies_file: str):
-        with open(cookies_file, "wb") as file:
-            pickle.dump(self.driver.get_cookies(), file)
+        data = json.dumps(self.driver.get_cookies()).encode()
+        digest = hashlib.blake2b(data).digest()
+
+        digest_file = cookies_file + ".sha"
+        if os.path.exists(cookies_file) and os.path.exists(digest_file):
+            with open(digest_file, "rb") as file:
+                if file.read() == digest:
+                    return
+
+        # Write via a temporary file so a crash mid-write cannot corrupt the cookie file.
+        with tempfile.NamedTemporaryFile(dir=self._cache_dir, delete=False) as file:
+            file.write(data)
+        os.replace(file.name, cookies_file)
+        with open(digest_file, "wb") as file:
+            file.write(digest)
+
+    def get_cached_companies(self, name: str) -> Optional[List["Company"]]:
+        row = self._company_cache.execute(
+            "SELECT payload FROM company_cache WHERE name = ? AND ts > ?",
+            (name, time.time() - COMPANY_CACHE_TTL),
+        ).fetchone()
+        if row is None:
+            return None
+        return [Company(**item) for item in json.loads(row[0])]
+
+    def cache_companies(self, name: str, companies: List["Company"]):
+        payload = json.dumps([company.dict() for company in companies])
+        self._company_cache.execute(
+            "INSERT OR REPLACE INTO company_cache VALUES (?, ?, ?)",
+            (name, payload, time.time()),
+        )
+        self._company_cache.commit()
 
     def get_username_from_url(self, url: str) -> Optional[str]:
-        match = self._username_pattern.search(url)
+        match = _USERNAME_PATTERN.search(url)
         return match.group(1) if match else None
 
     def get_company_name_from_id(self, company_id: int) -> str:
         pass
 
     def wait_for(self, by: str, value: str, timeout: float = 5.0) -> bool:
+        # Reuse one waiter per timeout and poll every 100 ms instead of Selenium's default 500 ms,
+        # so ready elements are detected sooner.
+        if timeout not in self._waiters:
+            self._waiters[timeout] = wait.WebDriverWait(self.driver, timeout=timeout, poll_frequency=0.1)
+
         try:
             element_present = expected_conditions.presence_of_element_located((by, value))
-            wait.WebDriverWait(self.driver, timeout=timeout).until(element_present)
+            self._waiters[timeout].until(element_present)
             return True
         except exceptions.TimeoutException:
             return False
@@ -175,51 +344,61 @@ class Company(BaseModel):
 
 
 def search_company(li_provider: LinkedInProvider, name: str) -> List[Company]:
+    cache_key = name.lower().strip()
+    cached = li_provider.get_cached_companies(cache_key)
+    if cached is not None:
+        return cached
+
     url = f"https://www.linkedin.com/search/results/companies/?keywords={name}"
     li_provider.driver.get(url=url)
     if not li_provider.wait_for(by=By.CLASS_NAME, value="entity-result__title-text"):
         return list()
 
-    results = li_provider.driver.find_elements(by=By.CLASS_NAME, value="entity-result__title-text")
-
-    companies = list()
-    for result in results:
-        link = result.find_element(By.XPATH, "a")
-        company = Company(name=link.text, url=link.get_attribute("href"))
-        companies.append(company)
+    # Collect all result links in one script call instead of paying a driver round-trip per element,
+    # per text, and per attribute.
+    links = li_provider.driver.execute_script(
+        "return Array.from(document.querySelectorAll('.entity-result__title-text a'))"
+        ".map(a => ({text: a.innerText, href: a.href}));"
+    )
+    companies = [Company(name=link["text"], url=link["href"]) for link in links]
 
-    company_id_pattern = re.compile(r"%22(\d+)%22")
+    # Reading the encoded company IDs does not need a browser render: they appear verbatim in the
+    # page markup, so a plain authenticated GET per company replaces the full page load.
+    session = li_provider.http_session()
+    all_fetches_ok = True
     for company in companies:
-        li_provider.driver.get(company.url)
-        li_provider.wait_for(by=By.CLASS_NAME, value="org-top-card-summary-info-list__info-item")
-        company_infos = li_provider.driver.find_elements(
-            by=By.CLASS_NAME, value="org-top-card-summary-info-list__info-item"
-        )
-        for ci in company_infos:
-            if ci.tag_name == "a":
-                employee_search_url = ci.get_attribute("href")
-                company_ids = list(company_id_pattern.findall(employee_search_url))
-                company.ids = company_ids
-                break
+        response = session.get(company.url)
+        if response.ok:
+            company.ids = list(dict.fromkeys(_COMPANY_ID_PATTERN.findall(response.text)))
+        else:
+            all_fetches_ok = False
 
+    # Only cache complete results; a transient non-OK response (LinkedIn readily returns 999 or
+    # login redirects to plain HTTP clients) must not suppress retries for the whole TTL.
+    if all_fetches_ok:
+        li_provider.cache_companies(cache_key, companies)
     return companies
 
 
 def search_profile(li_provider: LinkedInProvider, name: str, company_codes: List[int]) -> Tuple[Optional[str], float]:
-    company_encoding = ",".join(f'"{c}"' for c in company_codes)
+    # Percent-encode the quoted codes once; literal quotes are not valid in a URL query component
+    # and only happen to work in browsers.
+    company_encoding = parse.quote(",".join(f'"{c}"' for c in company_codes), safe="")
 
-    url = (
-        f"https://www.linkedin.com/search/results/people/?"
-        f"keywords={name}"
-        f"&origin=SPELL_CHECK_REPLACE"
-        f"&sid=(ol&spellCorrectionEnabled=false"
+    base_url = "https://www.linkedin.com/search/results/people/?" + parse.urlencode(
+        {"keywords": name, "origin": "SPELL_CHECK_REPLACE", "spellCorrectionEnabled": "false"}
     )
-
-    present = f"&currentCompany=[{company_encoding}]"
-    past = f"&pastCompany=[{company_encoding}]"
-    for employment in (present, past):
-        query_url = url + employment
+    # The two employment filters have to stay separate queries: combining them in one URL
+    # intersects the facets (current AND past employees) instead of uniting them.
+    query_urls = (
+        f"{base_url}&currentCompany=[{company_encoding}]",
+        f"{base_url}&pastCompany=[{company_encoding}]",
+    )
+    for query_url in query_urls:
         li_provider.driver.get(query_url)
+        if not li_provider.wait_for(by=By.CLASS_NAME, value="entity-result"):
+            continue
+
         results = li_provider.driver.find_elements(by=By.CLASS_NAME, value="entity-result")
         if len(results) == 0:
             continue
@@ -231,17 +410,15 @@ def search_profile(li_provider: LinkedInProvider, name: str, company_codes: List
             continue
 
         # Validate name
-        heading_elements = li_provider.driver.find_elements(by=By.TAG_NAME, value="h1")
-        match = False
-        match_rating = 0
-        for he in heading_elements:
-            if "text-heading-xlarge" in he.get_attribute("class"):
-                match_rating = Levenshtein.ratio(he.text, name)
-                match = match_rating > 0.3
-                if match:
-                    break
-
-        if not match:
+        try:
+            heading = li_provider.driver.find_element(by=By.CSS_SELECTOR, value="h1.text-heading-xlarge")
+        except exceptions.NoSuchElementException:
+            continue
+
+        # rapidfuzz returns a 0-100 score and bails out early (including on the length bound)
+        # once the score_cutoff is unreachable.
+        match_rating = fuzz.ratio(heading.text, name, score_cutoff=30) / 100
+        if match_rating <= 0.3:
             continue
 
         profile_url = li_provider.driver.current_url